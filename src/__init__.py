@@ -1,13 +1,25 @@
 import shutil
 import json
 import os
-from aqt import mw
+import time
+import threading
+from aqt import mw, gui_hooks
 from aqt.qt import *
 from aqt.utils import showInfo, showWarning, askUser
 from anki.notes import Note
 
 from .forms.add_words import AddWordsDialog
-from .parser.parser import CambridgeDict, LanGeekDict, download_file, OxfordDict
+from .forms.add_words_progress import AddWordsProgressDialog
+from .media.audio import AudioProcessor
+from .media.images import ImageProcessor
+from .parser.parser import TrafficCounter, download_file
+from .parser.cache import SqliteCache
+from .parser.pipeline import Pipeline, Stage, current_rss
+from .parser.prefetch import Budget, PrefetchQueue
+from .parser.providers import configure_providers, fetch_cards, primary_providers, save_providers
+from .parser.resolver import HeadwordResolver, normalize_query
+from .parser.store import DictionaryStore
+from .parser.suggestions import PrefixIndex
 
 
 CLOZE = 1
@@ -20,10 +32,30 @@ AVAILABLE_IMAGE = '_available.jpg'
 SEPARATOR_IMG = '&nbsp;'
 SEPARATOR_EXAMPLES = '<br>'
 PRON_CAMBRIDGE = 'https://dictionary.cambridge.org/pronunciation/english/'
+# caches are committed in batches, in bulk runs not more often than this
+CACHE_SAVE_INTERVAL = 30  # seconds
 
 
 addon_dir = os.path.dirname(__file__)
 template_dir = os.path.join(addon_dir, 'templates')
+user_files_dir = os.path.join(addon_dir, 'user_files')
+
+_resolver = None
+_store = None
+_audio_cache = None
+_headword_index = None
+_prefetching = {}  # (dictionary_name, normalized word) -> threading.Event set when the prefetch ends
+_prefetch_queue = None
+_prefetch_budget = None
+_prefetch_running = False
+_caches_saved_at = 0.0
+# the shared objects below are created lazily, also from background threads
+_init_lock = threading.RLock()
+# add_word waits for a prefetch of the same word not longer than this
+PREFETCH_WAIT_TIMEOUT = 60  # seconds
+_bulk_stops = set()  # threading.Event of every running list of words, they are set on profile close
+# the pipeline waits for the main thread to add notes of a word not longer than this
+COMMIT_TIMEOUT = 60  # seconds
 
 
 def get_config():
@@ -50,6 +82,150 @@ def get_definition_limit(config: dict):
         return definition_limit if definition_limit > 1 else 1
 
 
+def get_resolver(config: dict):
+    """
+    Get the headword resolver, it is shared by all lookups.
+
+    """
+    global _resolver
+    with _init_lock:
+        if _resolver is None:
+            settings = config.get("lookup_cache") or {}
+            _resolver = HeadwordResolver(os.path.join(user_files_dir, 'headwords.sqlite'),
+                                         ttl_days=settings.get("ttl_days", 90),
+                                         negative_ttl_days=settings.get("negative_ttl_days", 7))
+    return _resolver
+
+
+def get_store():
+    """
+    Get the local dictionary store.
+
+    """
+    global _store
+    with _init_lock:
+        if _store is None:
+            _store = DictionaryStore(os.path.join(user_files_dir, 'dictionary.sqlite'))
+    return _store
+
+
+def store_is_enabled(config: dict):
+    settings = config.get("dictionary_store") or {}
+    return bool(settings.get("enabled", True))
+
+
+def get_headword_index():
+    """
+    Get the index of headwords which were fetched before, it is used for completions.
+
+    """
+    global _headword_index
+    with _init_lock:
+        if _headword_index is None:
+            _headword_index = PrefixIndex(get_store().headwords())
+    return _headword_index
+
+
+def get_cards(word, dictionary_name, config: dict):
+    """
+    Get cards of the word from the local dictionary or fetch them from the dictionary.
+
+    """
+    definition_limit = get_definition_limit(config)
+    store = get_store() if store_is_enabled(config) else None
+    cards = store.get_cards(dictionary_name, word, definition_limit) if store else None
+
+    if cards is not None:
+        # the stored cards could be fetched with a bigger limit
+        for card in cards:
+            del card.data[definition_limit:]
+        return cards
+
+    resolver = get_resolver(config)
+    configure_providers(config, user_files_dir)
+    try:
+        cards = fetch_cards(dictionary_name, word, definition_limit, resolver)
+    finally:
+        if time.monotonic() - _caches_saved_at > CACHE_SAVE_INTERVAL:
+            save_caches()
+
+    if store and cards:
+        # cards are stored before cloze_anki() changes them
+        store.put_cards(dictionary_name, word, cards, definition_limit)
+        if _headword_index is not None:
+            for card in cards:
+                _headword_index.add(card.word)
+
+    return cards
+
+
+def prefetch_word(word, dictionary_name):
+    """
+    Fetch the word into the local dictionary in the background,
+    so the cards are ready when the user adds it.
+
+    """
+    config = get_config()
+    key = (dictionary_name, normalize_query(word))
+    if not store_is_enabled(config) or key in _prefetching:
+        return
+    finished = threading.Event()
+    _prefetching[key] = finished
+
+    def prefetch():
+        try:
+            return get_cards(word, dictionary_name, config)
+        finally:
+            # it is set in the background, add_word can wait on the main thread
+            finished.set()
+
+    def on_done(future):
+        _prefetching.pop(key, None)
+        try:
+            future.result()
+        except Exception as e:
+            # the word will be fetched again when it is added
+            print(f"Error prefetching {word}: {str(e)}")
+
+    mw.taskman.run_in_background(prefetch, on_done)
+
+
+def wait_for_prefetch(word, dictionary_name):
+    """
+    Wait until the prefetch of the word ends, so the word is not fetched twice.
+
+    """
+    finished = _prefetching.get((dictionary_name, normalize_query(word)))
+    if finished is not None:
+        finished.wait(PREFETCH_WAIT_TIMEOUT)
+
+
+def get_audio_cache():
+    """
+    Get the map of pronunciation urls and payloads to files in the media folder.
+
+    """
+    global _audio_cache
+    with _init_lock:
+        if _audio_cache is None:
+            _audio_cache = SqliteCache(os.path.join(user_files_dir, 'audio_files.sqlite'))
+    return _audio_cache
+
+
+def save_caches():
+    """
+    Save the resolver and provider caches.
+
+    """
+    global _caches_saved_at
+    _caches_saved_at = time.monotonic()
+    if _resolver is not None:
+        _resolver.save()
+    if _audio_cache is not None:
+        _audio_cache.save()
+    save_providers()
+
+
 def get_or_create_deck(config: dict):
     """
     Get or create the Dictionary deck.
@@ -145,53 +321,46 @@ def handle_duplicate_word(word, deck_id):
     return True, None  # Return True but no note ID means skip
 
 
-def add_pictures_from_langeek(query: str, cards: list):
-    langeek_cards = LanGeekDict(query).cards
-    # take pictures from LanGeek
-    for card in cards:
-        for langeek_card in langeek_cards:
-            card.add_images_equal_pos(langeek_card)
-
+def image_filename(card, url, image_processor=None):
+    extension = image_processor.extension if image_processor else '.jpeg'
+    return f"{card.word}_{card.pos}_{''.join(char for char in url if char.isdigit())}{extension}"
 
-def get_oxford_card(query: str, def_limit: int):
-    parser = OxfordDict(query, dictionary_type='en', definition_limit=def_limit)
-    add_pictures_from_langeek(query, parser.cards)
-    return parser.cards
 
+def download_image(card, url, media_dir, image_processor=None):
+    filename = image_filename(card, url, image_processor)
+    if image_processor:
+        return image_processor.download(url, media_dir, filename)
+    return download_file(url, media_dir, filename)
 
-def get_cambridge_cards(query: str, def_limit: int):
 
-    # get main meaning from English-Russian Cambridge Dictionary
-    parser = CambridgeDict(query, dictionary_type='en-ru', definition_limit=def_limit)
-    main_cards = parser.cards
+def download_pronunciation(card, accent, url, media_dir, audio_processor=None):
+    if audio_processor:
+        return audio_processor.download(card.word, accent, url)
+    return download_file(url, media_dir, f'{card.word}_{accent}.mp3')
 
-    if main_cards:
-        # take pictures from English Cambridge Dictionary
-        parser.fetch_cards(query, dictionary_type='en')
-        donor_cards = parser.cards
-
-        for main_card in main_cards:
-            for donor_card in donor_cards:
-                main_card.add_images_equal_pos(donor_card)
-    else:
-        # get main meaning from English Cambridge Dictionary
-        main_cards = CambridgeDict(query, dictionary_type='en', definition_limit=def_limit).cards
 
-    add_pictures_from_langeek(query, main_cards)
+def download_card_media(card, media_dir, image_processor=None, audio_processor=None):
+    """
+    Download images and pronunciations of the card.
 
-    return main_cards
+    :return: dict of filenames in the media folder {'images': [...], 'uk': str, 'us': str},
+             failed downloads are left out or empty
+    """
+    images = [download_image(card, url, media_dir, image_processor) for url in card.src_images]
+    return {'images': [filename for filename in images if filename],
+            'uk': download_pronunciation(card, 'uk', card.src_uk_mp3, media_dir, audio_processor),
+            'us': download_pronunciation(card, 'us', card.src_us_mp3, media_dir, audio_processor)}
 
 
-def fill_fields_out(note, card, index=0):
+def fill_fields_out(note, card, media, index=0):
+    """
+    :param media: filenames of the card from download_card_media(), nothing is downloaded here
+    """
 
     note.fields[0] = f'{card.word}|{index + 1}|{card.pos}'  # Word
 
-    if card.src_images:
-        filenames = []
-        for url in card.src_images:
-            filename = f"{card.word}_{card.pos}_{''.join(char for char in url if char.isdigit())}.jpeg"
-            filenames.append(download_file(url, mw.col.media.dir(), filename))
-        note.fields[1] = SEPARATOR_IMG.join([f'<img src="{f}" >' for f in filenames])
+    if media['images']:
+        note.fields[1] = SEPARATOR_IMG.join([f'<img src="{f}" >' for f in media['images']])
 
     note.fields[2] = card.pos  # PartOfSpeech
 
@@ -215,13 +384,11 @@ def fill_fields_out(note, card, index=0):
 
     note.fields[11] = card.pron_uk  # PronUK
 
-    pron_uk_filename = download_file(card.src_uk_mp3, mw.col.media.dir(), f'{card.word}_uk.mp3')
-    note.fields[12] = f"[sound:{pron_uk_filename}]" if pron_uk_filename else '' # AudioUK
+    note.fields[12] = f"[sound:{media['uk']}]" if media['uk'] else '' # AudioUK
 
     note.fields[13] = card.pron_us  # PronUS
 
-    pron_us_filename = download_file(card.src_us_mp3, mw.col.media.dir(), f'{card.word}_us.mp3')
-    note.fields[14] = f"[sound:{pron_us_filename}]" if pron_us_filename else ''  # AudioUS
+    note.fields[14] = f"[sound:{media['us']}]" if media['us'] else ''  # AudioUS
 
     note.fields[15] = f"<a href='{card.source}' title='Go to a source of this definition'>(Source)</a>" if card.source else ''  # Source
 
@@ -230,6 +397,28 @@ def fill_fields_out(note, card, index=0):
     note.tags = [card.pos, card.word[0]]  # Tags
 
 
+def add_cards_to_deck(cards, config: dict, deck, model, media=None):
+    """
+    Create notes from the cards and add them to the deck.
+
+    :param media: filenames of every card from download_media(), without it media are downloaded here
+    """
+    if media is None:
+        media = download_media(cards, config, mw.col.media.dir())
+
+    for card, card_media in zip(cards, media):
+        # make an insert {{c1: word}} for the fields of Definition and Examples
+        card.cloze_anki()
+
+        for index in range(len(card.data)):
+            #  Create new note
+            note = Note(mw.col, model)
+            # Map data to note fields
+            fill_fields_out(note, card, card_media, index)
+            # Save new note
+            mw.col.add_note(note, deck["id"])
+
+
 def add_word(word, dictionary_name):
     """
     Add a word to Anki deck.
@@ -239,7 +428,6 @@ def add_word(word, dictionary_name):
         config = get_config()
         deck = get_or_create_deck(config)
         model = get_or_create_note_model(config)
-        definition_limit = get_definition_limit(config)
 
         # # Check for duplicates in the specific deck
         # is_duplicate, note_id = handle_duplicate_word(word, deck['id'])
@@ -247,76 +435,369 @@ def add_word(word, dictionary_name):
         #     if not note_id:  # User chose to skip
         #         return
 
-        if dictionary_name == 'Oxford':
-            cards = get_oxford_card(word, definition_limit)
-        else:
-            cards = get_cambridge_cards(word, definition_limit)
+        wait_for_prefetch(word, dictionary_name)
+        cards = get_cards(word, dictionary_name, config)
 
         if not cards:
             raise Exception("No data found for word")
 
-        for card in cards:
-            # make an insert {{c1: word}} for the fields of Definition and Examples
-            card.cloze_anki()
-
-            for index in range(len(card.data)):
-                #  Create new note
-                note = Note(mw.col, model)
-                # Map data to note fields
-                fill_fields_out(note, card, index)
-                # Save new note
-                mw.col.add_note(note, deck["id"])
+        add_cards_to_deck(cards, config, deck, model)
 
     except Exception as e:
         raise Exception(f"Error adding word {word}: {str(e)}")
 
 
-def add_from_oxford_dictionary():
+def add_from_dictionary(dictionary_name):
+    if store_is_enabled(get_config()):
+        dialog = AddWordsDialog(mw, dictionary_name, get_headword_index(),
+                                lambda word: prefetch_word(word, dictionary_name))
+    else:
+        dialog = AddWordsDialog(mw, dictionary_name)
+    if dialog.exec():
+        word = dialog.get_word()
+        if word:
+            try:
+                add_word(word, dictionary_name)
+                showInfo(f"Successfully added '{word}' from {dictionary_name} Dictionary.")
+            except Exception as e:
+                showWarning(f"Error adding word: {str(e)}")
+
+
+def get_prefetch_settings(config: dict):
+    settings = {"enabled": True, "interval_seconds": 20, "max_requests_per_minute": 20,
+                "max_kilobytes_per_minute": 2048, "media": True}
+    settings.update(config.get("prefetch") or {})
+    return settings
+
+
+def get_prefetch_queue():
+    global _prefetch_queue
+    if _prefetch_queue is None:
+        _prefetch_queue = PrefetchQueue(os.path.join(user_files_dir, 'prefetch_queue.json'))
+    return _prefetch_queue
+
+
+def get_prefetch_budget(settings: dict):
+    global _prefetch_budget
+    if _prefetch_budget is None:
+        _prefetch_budget = Budget(int(settings["max_requests_per_minute"]),
+                                  int(settings["max_kilobytes_per_minute"]) * 1024)
+    return _prefetch_budget
+
+
+def warm_word(word, dictionary_name, config: dict, media: bool, media_dir: str, traffic: TrafficCounter):
     """
-        Handle the button click in main window.
+    Fetch cards of the word into the local dictionary and download their media.
+    It runs in the background, media_dir is read on the main thread.
+    Requests and received bytes of pages, api calls and media are counted in traffic, even if it fails.
 
     """
-    dictionary_name = 'Oxford'
-    add_from_dictionary(dictionary_name)
+    with traffic:
+        cards = get_cards(word, dictionary_name, config)
+        if media and cards:
+            download_media(cards, config, media_dir)
 
 
-def add_from_cambridge_dictionary():
+def download_media(cards, config: dict, media_dir: str) -> list:
     """
-    Handle the button click in main window.
+    Download images and pronunciations of the cards into the media folder.
+    It can run in the background, media_dir is read on the main thread.
 
+    :return: list of filenames of every card, see download_card_media()
     """
-    dictionary_name = 'Cambridge'
-    add_from_dictionary(dictionary_name)
+    # media are processed in the background while the next ones are downloaded
+    with ImageProcessor(config) as image_processor, \
+            AudioProcessor(config, media_dir, get_audio_cache()) as audio_processor:
+        return [download_card_media(card, media_dir, image_processor, audio_processor) for card in cards]
 
 
-def add_from_dictionary(dictionary_name):
-    dialog = AddWordsDialog(mw, dictionary_name)
-    if dialog.exec():
-        word = dialog.get_word()
-        if word:
+def anki_is_idle():
+    """
+    The user is not reviewing and no dialog is open.
+
+    """
+    return (mw.col is not None and mw.state in ('deckBrowser', 'overview')
+            and QApplication.activeModalWidget() is None)
+
+
+def on_prefetch_timer():
+    """
+    Warm caches for the next queued word while Anki is idle and the budget allows it.
+
+    """
+    global _prefetch_running
+    config = get_config()
+    settings = get_prefetch_settings(config)
+    if _prefetch_running or not settings["enabled"] or not store_is_enabled(config) or not anki_is_idle():
+        return
+
+    budget = get_prefetch_budget(settings)
+    queue = get_prefetch_queue()
+    item = queue.peek()
+    if item is None or not budget.allows():
+        return
+
+    dictionary_name, word = item
+    _prefetch_running = True
+
+    def on_done(future):
+        global _prefetch_running
+        _prefetch_running = False
+        budget.record(traffic.requests, traffic.received)
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error prefetching {word}: {str(e)}")
+            queue.failed(dictionary_name, word)
+        else:
+            queue.done(dictionary_name, word)
+
+    media_dir = mw.col.media.dir()
+    traffic = TrafficCounter()
+    mw.taskman.run_in_background(
+        lambda: warm_word(word, dictionary_name, config, settings["media"], media_dir, traffic), on_done)
+
+
+def queue_words_for_prefetch():
+    """
+    Ask the user for words which will be added later, they are fetched while Anki is idle.
+
+    """
+    names = [provider.name for provider in primary_providers()]
+    dictionary_name, ok = QInputDialog.getItem(mw, "Queue Words for Prefetch", "Dictionary:", names, 0, False)
+    if not ok:
+        return
+    text, ok = QInputDialog.getMultiLineText(mw, "Queue Words for Prefetch", "Words (one per line):")
+    if not ok:
+        return
+    words = [word for word in text.splitlines() if word.strip()]
+    queue = get_prefetch_queue()
+    queue.add(dictionary_name, words)
+    showInfo(f"{len(queue)} words are queued for prefetch.")
+
+
+def get_bulk_settings(config: dict):
+    settings = {"queue_size": 4, "fetch_workers": 2, "memory_headroom_mb": 256}
+    settings.update(config.get("bulk_add") or {})
+    return settings
+
+
+def read_words(path):
+    """
+    Read words from the file line by line, the file is never read whole.
+
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            word = line.strip()
+            if word:
+                yield word
+
+
+def add_words_in_pipeline(words, dictionary_name, config: dict, deck, model, media_dir, on_error,
+                          stop: threading.Event, on_progress=None):
+    """
+    Add words through the streaming pipeline: fetch, resolve, parse and enrich -> download -> commit.
+    Only a few words are in memory at once however long the list is. It runs in the background,
+    notes are added on the main thread. The run ends early when stop is set.
+
+    :param on_progress: function(number of added words, last added word), it is called in the background
+    :return: number of added words
+    """
+    settings = get_bulk_settings(config)
+    # the ceiling is relative to memory which Anki uses before the run
+    rss = current_rss()
+    memory_limit = rss + int(settings["memory_headroom_mb"]) * 1024 * 1024 if rss is not None else None
+    if memory_limit is None:
+        print("Memory ceiling of adding words is not active: memory of the process is unknown on this platform")
+
+    def fetch(word):
+        cards = get_cards(word, dictionary_name, config)
+        if not cards:
+            raise Exception("No data found for word")
+        return word, cards
+
+    def download(item):
+        word, cards = item
+        return word, cards, download_media(cards, config, media_dir)
+
+    def commit(item):
+        # media are downloaded already, the main thread is not blocked by the network
+        word, cards, media = item
+        done = threading.Event()
+        abandoned = threading.Event()
+        errors = []
+
+        def add():
             try:
-                add_word(word, dictionary_name)
-                showInfo(f"Successfully added '{word}' from {dictionary_name} Dictionary.")
+                # the profile may be closed or the word given up while it waited for the main thread
+                if stop.is_set() or abandoned.is_set():
+                    raise Exception("Adding words is stopped")
+                add_cards_to_deck(cards, config, deck, model, media)
             except Exception as e:
-                showWarning(f"Error adding word: {str(e)}")
+                errors.append(e)
+            finally:
+                done.set()
+
+        mw.taskman.run_on_main(add)
+        if not done.wait(COMMIT_TIMEOUT):
+            abandoned.set()
+            raise Exception("Anki did not add the notes in time")
+        if errors:
+            raise errors[0]
+        return word
+
+    pipeline = Pipeline([Stage('fetch', fetch, workers=int(settings["fetch_workers"])),
+                         Stage('download', download),
+                         Stage('commit', commit)],
+                        queue_size=int(settings["queue_size"]),
+                        memory_limit=memory_limit,
+                        on_error=on_error,
+                        stop_event=stop)
+
+    number = 0
+    try:
+        for word in pipeline.run(words):
+            number += 1
+            if on_progress:
+                on_progress(number, word)
+        return number
+    finally:
+        save_caches()
 
 
-# Create a menu action
-action = QAction("Add from Cambridge Dictionary", mw)
-action.triggered.connect(add_from_cambridge_dictionary)
-action.setToolTip("Add word from Cambridge Dictionary")
+def add_words_from_list():
+    """
+    Add all words of a text file, one word per line.
 
-action_oxford = QAction("Add from Oxford Dictionary", mw)
-action_oxford.triggered.connect(add_from_oxford_dictionary)
-action_oxford.setToolTip("Add word from Oxford Dictionary")
+    """
+    names = [provider.name for provider in primary_providers()]
+    dictionary_name, ok = QInputDialog.getItem(mw, "Add Words from List", "Dictionary:", names, 0, False)
+    if not ok:
+        return
+    path, _ = QFileDialog.getOpenFileName(mw, "Add Words from List", "", "Text (*.txt)")
+    if not path:
+        return
+
+    config = get_config()
+    deck = get_or_create_deck(config)
+    model = get_or_create_note_model(config)
+    media_dir = mw.col.media.dir()
+    failed = []
+    stop = threading.Event()
+    _bulk_stops.add(stop)
+    dialog = AddWordsProgressDialog(mw, dictionary_name, stop.set)
+    dialog.show()
+
+    def on_progress(number, word):
+        mw.taskman.run_on_main(lambda: dialog.set_progress(number, word))
+
+    def on_error(stage_name, item, error):
+        word = item[0] if isinstance(item, tuple) else item
+        # only the first failures are kept, the list can be very long
+        if len(failed) < 20:
+            failed.append(f"{word} ({stage_name}: {str(error)})")
+        print(f"Error adding word {word} at {stage_name}: {str(error)}")
+
+    def on_done(future):
+        _bulk_stops.discard(stop)
+        dialog.finish()
+        if mw.col is None:
+            # the profile is closed
+            return
+        try:
+            number = future.result()
+        except Exception as e:
+            # words read before the error are added already
+            mw.reset()
+            showWarning(f"Error adding words: {str(e)}")
+            return
+        message = f"Added {number} words from {dictionary_name} Dictionary."
+        if stop.is_set():
+            message += " Adding was stopped before the end of the list."
+        if failed:
+            message += "\n\nNot added:\n" + "\n".join(failed)
+        showInfo(message)
+        mw.reset()
+
+    mw.taskman.run_in_background(
+        lambda: add_words_in_pipeline(read_words(path), dictionary_name, config, deck, model, media_dir,
+                                      on_error, stop, on_progress),
+        on_done)
+
+
+def stop_adding_words():
+    """
+    Stop every running list of words, the notes can not be added after the profile is closed.
+
+    """
+    for stop in list(_bulk_stops):
+        stop.set()
 
-# Add menu item to Tools menu
-mw.form.menuTools.addAction(action)
-mw.form.menuTools.addAction(action_oxford)
 
-# Create and add toolbar
+def import_dictionary_snapshot():
+    """
+    Import a prebuilt snapshot of the local dictionary.
+
+    """
+    path, _ = QFileDialog.getOpenFileName(mw, "Import dictionary snapshot", "", "SQLite (*.sqlite *.db)")
+    if path:
+        try:
+            number = get_store().import_snapshot(path)
+            showInfo(f"Imported {number} words into the local dictionary.")
+        except Exception as e:
+            showWarning(f"Error importing snapshot: {str(e)}")
+
+
+def export_dictionary_snapshot():
+    """
+    Export the local dictionary to share it.
+
+    """
+    path, _ = QFileDialog.getSaveFileName(mw, "Export dictionary snapshot", "dictionary.sqlite",
+                                          "SQLite (*.sqlite *.db)")
+    if path:
+        try:
+            get_store().export_snapshot(path)
+            showInfo("The local dictionary is exported.")
+        except Exception as e:
+            showWarning(f"Error exporting snapshot: {str(e)}")
+
+
+# Create a menu action and a toolbar button for every dictionary
 toolbar = QToolBar("Add from Dictionary")
-toolbar.addAction(action)
-toolbar.addAction(action_oxford)
+
+for provider in primary_providers():
+    action = QAction(f"Add from {provider.name} Dictionary", mw)
+    action.triggered.connect(lambda _, name=provider.name: add_from_dictionary(name))
+    action.setToolTip(f"Add word from {provider.name} Dictionary")
+
+    # Add menu item to Tools menu
+    mw.form.menuTools.addAction(action)
+    toolbar.addAction(action)
+
 mw.addToolBar(toolbar)
 
+action_bulk = QAction("Add Words from List...", mw)
+action_bulk.triggered.connect(add_words_from_list)
+mw.form.menuTools.addAction(action_bulk)
+
+action_import = QAction("Import Dictionary Snapshot...", mw)
+action_import.triggered.connect(import_dictionary_snapshot)
+mw.form.menuTools.addAction(action_import)
+
+action_export = QAction("Export Dictionary Snapshot...", mw)
+action_export.triggered.connect(export_dictionary_snapshot)
+mw.form.menuTools.addAction(action_export)
+
+action_prefetch = QAction("Queue Words for Prefetch...", mw)
+action_prefetch.triggered.connect(queue_words_for_prefetch)
+mw.form.menuTools.addAction(action_prefetch)
+
+gui_hooks.profile_will_close.append(stop_adding_words)
+gui_hooks.profile_will_close.append(save_caches)
+
+# Warm caches for queued words in idle time
+prefetch_timer = QTimer(mw)
+prefetch_timer.timeout.connect(on_prefetch_timer)
+prefetch_timer.start(int(get_prefetch_settings(get_config())["interval_seconds"]) * 1000)
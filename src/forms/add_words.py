@@ -1,12 +1,24 @@
-from aqt.qt import QDialog, Qt
+from aqt.qt import QDialog, Qt, QCompleter, QStringListModel, QTimer
 from .dialog_ui import Ui_Dialog
 import os
 import json
 
+# the typed text is considered stable after this pause
+PREFETCH_DELAY_MS = 600
+MIN_PREFETCH_LENGTH = 3
+COMPLETION_LIMIT = 10
+
+
 class AddWordsDialog(QDialog):
-    def __init__(self, mw, dictionary_name='Cambridge'):
+    def __init__(self, mw, dictionary_name='Cambridge', headword_index=None, prefetch=None):
+        """
+        :param headword_index: PrefixIndex of known headwords for completions
+        :param prefetch: function(word), it fetches the word in the background while the user is typing
+        """
         QDialog.__init__(self, mw, Qt.WindowType.Window)
         self.mw = mw
+        self.headword_index = headword_index
+        self.prefetch = prefetch
         self.form = Ui_Dialog()
         self.form.setupUi(self)
         self.form.buttonBox.accepted.connect(self.accept)
@@ -14,13 +26,47 @@ class AddWordsDialog(QDialog):
 
         # Set up word input
         self.form.wordInput.setPlaceholderText("Enter word")
-        
+
+        # Set up completions of known headwords
+        self.completion_model = QStringListModel(self)
+        self.completer = QCompleter(self.completion_model, self)
+        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.form.wordInput.setCompleter(self.completer)
+
+        # Set up speculative prefetch of the typed word
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(PREFETCH_DELAY_MS)
+        self.prefetch_timer.timeout.connect(self.on_text_stable)
+
+        self.form.wordInput.textEdited.connect(self.on_text_edited)
+
         self.resize(400, 100)
         self.setWindowTitle(f"Add from {dictionary_name} Dictionary")
-        
+
+    def on_text_edited(self, text):
+        if self.headword_index is not None:
+            self.completion_model.setStringList(self.headword_index.complete(text, COMPLETION_LIMIT))
+        # debounce, the timer is restarted on every edit
+        self.prefetch_timer.start()
+
+    def on_text_stable(self):
+        word = self.get_word()
+        if not self.prefetch or len(word) < MIN_PREFETCH_LENGTH:
+            return
+        # a known headword is served by the local dictionary, there is nothing to prefetch
+        if self.headword_index is not None and word in self.headword_index:
+            return
+        self.prefetch(word)
+
     def accept(self):
+        self.prefetch_timer.stop()
         super().accept()
-        
+
+    def reject(self):
+        self.prefetch_timer.stop()
+        super().reject()
+
     def get_word(self):
         """Get the word from the text input."""
         text = self.form.wordInput.text().strip()
@@ -0,0 +1,49 @@
+from aqt.qt import QDialog, QDialogButtonBox, QLabel, Qt, QVBoxLayout
+
+
+class AddWordsProgressDialog(QDialog):
+    """
+    Non-modal progress of adding words from a list, Anki can be used while it runs.
+
+    """
+
+    def __init__(self, mw, dictionary_name, on_cancel):
+        """
+        :param on_cancel: function(), it asks the run to stop after the words in progress
+        """
+        QDialog.__init__(self, mw, Qt.WindowType.Window)
+        self.on_cancel = on_cancel
+        self.is_finished = False
+
+        self.verticalLayout = QVBoxLayout(self)
+        self.label = QLabel("Starting...", self)
+        self.verticalLayout.addWidget(self.label)
+        self.buttonBox = QDialogButtonBox(QDialogButtonBox.StandardButton.Cancel, self)
+        self.buttonBox.rejected.connect(self.reject)
+        self.verticalLayout.addWidget(self.buttonBox)
+
+        self.resize(350, 80)
+        self.setWindowTitle(f"Adding Words from {dictionary_name} Dictionary")
+
+    def set_progress(self, number, word):
+        if not self.is_finished:
+            self.label.setText(f"Added {number} words, the last one is '{word}'.")
+
+    def cancel(self):
+        if self.is_finished:
+            return
+        self.buttonBox.setEnabled(False)
+        self.label.setText("Stopping after the words in progress...")
+        self.on_cancel()
+
+    def finish(self):
+        self.is_finished = True
+        self.close()
+
+    def reject(self):
+        # Esc and Cancel stop the run, the dialog stays until it is stopped
+        self.cancel()
+
+    def closeEvent(self, event):
+        self.cancel()
+        super().closeEvent(event)
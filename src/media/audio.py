@@ -0,0 +1,177 @@
+import os
+import hashlib
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from ..parser.parser import download_file
+
+DEFAULT_WORKERS = 2
+SILENCE_THRESHOLD = '-50dB'
+LOUDNESS = 'loudnorm=I=-16:TP=-1.5:LRA=11'
+
+
+def file_digest(filepath: str) -> str:
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def process_audio(ffmpeg: str, filepath: str, normalize: bool, trim_silence: bool) -> str:
+    """
+    Trim leading and trailing silence and normalize loudness of the mp3 file with ffmpeg.
+    The file is replaced in place.
+
+    """
+    filters = []
+    if trim_silence:
+        trim = f'silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD}'
+        # the trailing silence is removed from the reversed stream
+        filters += [trim, 'areverse', trim, 'areverse']
+    if normalize:
+        filters.append(LOUDNESS)
+
+    tmp_path = f'{filepath}.tmp.mp3'
+    try:
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', filepath,
+                        '-af', ','.join(filters), '-map_metadata', '-1',
+                        '-codec:a', 'libmp3lame', '-q:a', '5', tmp_path],
+                       check=True, timeout=60,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.replace(tmp_path, filepath)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        print(f"Error processing audio {filepath}: {str(e)}")
+
+    return filepath
+
+
+class AudioProcessor:
+    """
+    Audio stage for pronunciations.
+    Each headword is downloaded once per accent, identical payloads are stored once,
+    and new files are optionally trimmed and normalized in a pool of workers.
+
+    """
+
+    def __init__(self, config: dict, filedir: str, cache=None):
+        """
+        :param cache: persistent SqliteCache of url -> filename and sha1 of payload -> filename,
+                      without it identical payloads are detected only in this session
+        """
+        settings = config.get('audio_processing') or {}
+        self.filedir = filedir
+        self.cache = cache
+        self.normalize = bool(settings.get('normalize', False))
+        self.trim_silence = bool(settings.get('trim_silence', False))
+        try:
+            self.workers = max(int(settings.get('workers', DEFAULT_WORKERS)), 1)
+        except (TypeError, ValueError):
+            self.workers = DEFAULT_WORKERS
+
+        self.ffmpeg = shutil.which('ffmpeg') if self.normalize or self.trim_silence else None
+
+        self._by_headword = {}  # (headword, accent) -> filename
+        self._files = {}        # 'url:...' or 'sha1:...' -> filename, used without the cache
+        self._executor = None
+        self._futures = []
+
+    def _get_file(self, key):
+        """
+        Return the stored filename of the key if the file still exists, otherwise None.
+
+        """
+        if self.cache is not None:
+            filename = self.cache.get(key)[1]
+        else:
+            filename = self._files.get(key)
+        if filename and os.path.exists(os.path.join(self.filedir, filename)):
+            return filename
+        return None
+
+    def _set_file(self, key, filename):
+        if self.cache is not None:
+            self.cache.set(key, filename)
+        else:
+            self._files[key] = filename
+
+    def download(self, word: str, accent: str, url: str) -> str:
+        """
+        Download the pronunciation of the word and return the filename in the media folder.
+        An empty string is returned if there is no pronunciation.
+
+        """
+        key = (word.lower(), accent)
+        if key in self._by_headword:
+            return self._by_headword[key]
+
+        filename = self._download(word, accent, url)
+        self._by_headword[key] = filename
+        return filename
+
+    def _download(self, word, accent, url):
+        if not url:
+            return ''
+
+        filename = self._get_file(f'url:{url}')
+        if filename:
+            return filename
+
+        filename = f'{word}_{accent}.mp3'
+        if os.path.exists(os.path.join(self.filedir, filename)):
+            # it was added earlier, may be from another dictionary
+            self._set_file(f'url:{url}', filename)
+            return filename
+
+        filename = download_file(url, self.filedir, filename)
+        if not filename:
+            return ''
+
+        # the digest of the raw payload is kept, ffmpeg changes the stored file later
+        filepath = os.path.join(self.filedir, filename)
+        digest_key = f'sha1:{file_digest(filepath)}'
+        stored_filename = self._get_file(digest_key)
+        if stored_filename and stored_filename != filename:
+            # the same payload is stored already, e.g. for the other accent
+            os.remove(filepath)
+            self._set_file(f'url:{url}', stored_filename)
+            return stored_filename
+
+        self._set_file(digest_key, filename)
+        self._set_file(f'url:{url}', filename)
+        self.submit(filepath)
+        return filename
+
+    def submit(self, filepath: str):
+        if not self.ffmpeg:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._futures.append(self._executor.submit(process_audio, self.ffmpeg, filepath,
+                                                   self.normalize, self.trim_silence))
+
+    def wait(self):
+        """
+        Wait until all submitted files are processed.
+
+        """
+        wait(self._futures)
+        self._futures = []
+
+    def close(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,136 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from aqt.qt import QImage, QImageWriter, Qt
+
+from ..parser.parser import download_file
+
+
+FORMATS = {'webp': ('WEBP', '.webp'),
+           'jpeg': ('JPEG', '.jpeg')}
+
+
+def is_supported(image_format: str) -> bool:
+    """
+    Check whether Qt has a writer plugin for the format, webp is a plugin of its own.
+
+    """
+    return FORMATS[image_format][0].lower().encode() in [bytes(name).lower() for name in
+                                                          QImageWriter.supportedImageFormats()]
+
+DEFAULT_MAX_SIZE = 640
+DEFAULT_QUALITY = 80
+DEFAULT_WORKERS = 2
+
+
+def process_image(filepath: str, max_size: int, image_format: str, quality: int) -> str:
+    """
+    Resize the image to fit in max_size x max_size, re-encode it and strip its metadata.
+    The file is replaced in place.
+
+    """
+    qt_format = FORMATS[image_format][0]
+    tmp_path = f'{filepath}.tmp'
+
+    try:
+        # QImage, unlike QPixmap, can be used outside of the main thread
+        img = QImage(filepath)
+        if img.isNull():
+            raise ValueError("unsupported image")
+        if img.width() > max_size or img.height() > max_size:
+            img = img.scaled(max_size, max_size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+        if qt_format == 'JPEG' and img.hasAlphaChannel():
+            img = img.convertToFormat(QImage.Format.Format_RGB32)
+        # QImage keeps no exif, so the re-encoded file has no metadata
+        if not img.save(tmp_path, qt_format, quality):
+            raise ValueError(f"{qt_format} is not written")
+        os.replace(tmp_path, filepath)
+    except Exception as e:
+        # leave the original file, it is still a valid image for Anki
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        print(f"Error processing image {filepath}: {str(e)}")
+
+    return filepath
+
+
+class ImageProcessor:
+    """
+    Post-processing stage for downloaded images.
+    Images are processed with Qt in a pool of workers, so downloads are not blocked.
+    PyQt releases the GIL while Qt decodes, resizes and encodes,
+    so a thread pool is enough and the add-on is not re-imported in child processes.
+
+    """
+
+    def __init__(self, config: dict):
+        settings = config.get('image_processing') or {}
+        self.enabled = bool(settings.get('enabled', False))
+        self.max_size = _positive_int(settings.get('max_size'), DEFAULT_MAX_SIZE)
+        self.quality = min(_positive_int(settings.get('quality'), DEFAULT_QUALITY), 100)
+        self.workers = _positive_int(settings.get('workers'), DEFAULT_WORKERS)
+
+        self.image_format = str(settings.get('format', 'webp')).lower()
+        if self.image_format not in FORMATS or not is_supported(self.image_format):
+            self.image_format = 'jpeg'
+
+        self._executor = None
+        self._futures = []
+
+    @property
+    def extension(self) -> str:
+        if not self.enabled:
+            return '.jpeg'
+        return FORMATS[self.image_format][1]
+
+    def submit(self, filepath: str):
+        if not self.enabled:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._futures.append(self._executor.submit(process_image, filepath,
+                                                   self.max_size, self.image_format, self.quality))
+
+    def download(self, url: str, filedir: str, filename: str) -> str:
+        """
+        Download an image and queue it for processing.
+        Already existing files are not processed again.
+
+        """
+        is_new = not os.path.exists(os.path.join(filedir, filename))
+        filename = download_file(url, filedir, filename)
+        if filename and is_new:
+            self.submit(os.path.join(filedir, filename))
+        return filename
+
+    def wait(self):
+        """
+        Wait until all submitted images are processed.
+
+        """
+        wait(self._futures)
+        self._futures = []
+
+    def close(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _positive_int(value, default: int) -> int:
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
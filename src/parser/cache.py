@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+DAY = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    time REAL NOT NULL,
+    value TEXT
+);
+"""
+
+
+class SqliteCache:
+    """
+    Persistent key-value cache in SQLite, entries are read from the file on demand,
+    so memory does not grow with the number of entries.
+    A value None is a negative result, it has its own time to live.
+    Changes are committed by save().
+
+    """
+
+    def __init__(self, path: str, ttl: float = None, negative_ttl: float = None):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    @staticmethod
+    def _dump(value):
+        return None if value is None else json.dumps(value, ensure_ascii=False)
+
+    def _is_expired(self, fetched, value):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        return ttl is not None and time.time() - fetched > ttl
+
+    def get(self, key: str):
+        """
+        Return a pair (found, value).
+        found is False if the key is missing or expired, value is None for negative results.
+
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT time, value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return False, None
+            fetched, value = row
+            if self._is_expired(fetched, value):
+                self.delete(key)
+                return False, None
+            return True, None if value is None else json.loads(value)
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO entries (key, time, value) VALUES (?, ?, ?)',
+                                     (key, time.time(), self._dump(value)))
+
+    def set_negative(self, key: str):
+        self.set(key, None)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def save(self):
+        """
+        Drop expired entries and commit changes.
+
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            if self.ttl is not None:
+                self._connection.execute('DELETE FROM entries WHERE value IS NOT NULL AND time < ?',
+                                         (now - self.ttl,))
+            if self.negative_ttl is not None:
+                self._connection.execute('DELETE FROM entries WHERE value IS NULL AND time < ?',
+                                         (now - self.negative_ttl,))
+
+    def close(self):
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
@@ -1,12 +1,15 @@
 import re
 import os
 import time
+import threading
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 import requests
 from requests import Session
 
+from .cache import SqliteCache, DAY
+
 
 LIMIT_OF_THE_SAME_WORDS = 3
 
@@ -77,6 +80,36 @@ class Card:
                 self.data[i]['examples'] = []
 
 
+_traffic = threading.local()
+
+
+class TrafficCounter:
+    """
+    Counts requests and received bytes of the current thread while it is active.
+
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.received = 0
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = getattr(_traffic, 'counter', None)
+        _traffic.counter = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _traffic.counter = self._previous
+
+
+def count_traffic(requests: int = 0, received: int = 0):
+    counter = getattr(_traffic, 'counter', None)
+    if counter is not None:
+        counter.requests += requests
+        counter.received += received
+
+
 def strip_ending(word):
     for ending in endings:
         if word.endswith(ending):
@@ -114,17 +147,21 @@ def download_file(url: str, filedir: str, filename: str) -> str:
 
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, headers=headers, timeout=45)
-
-            if response.status_code != 200:
-                if attempt < max_retries - 1:
-                    time.sleep(retry_interval)
-                    continue
-                return ""
-
-            # Create file
-            with open(filepath, "wb") as f:
-                f.write(response.content)
+            # the body is streamed to the file, so the whole file is never in memory
+            count_traffic(requests=1)
+            with requests.get(url, headers=headers, timeout=45, stream=True) as response:
+
+                if response.status_code != 200:
+                    if attempt < max_retries - 1:
+                        time.sleep(retry_interval)
+                        continue
+                    return ""
+
+                # Create file
+                with open(filepath, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                        count_traffic(received=len(chunk))
 
             return filename
 
@@ -153,9 +190,11 @@ class OxfordDict:
                   'am-en': '/search/american_english/'}
     base_url = 'https://www.oxfordlearnersdictionaries.com/'
 
-    def __init__(self, word, dictionary_type='en', definition_limit = 1):
+    def __init__(self, word, dictionary_type='en', definition_limit = 1, resolver=None):
         self.def_limit = definition_limit
+        self.resolver = resolver
         self.soup = BeautifulSoup()
+        self.response = None
         self.cards = []
         self.session = requests.Session()
         self.session.headers.update({
@@ -169,14 +208,38 @@ class OxfordDict:
         self.fetch_cards(word, dictionary_type)
 
     def fetch_cards(self, word, dictionary_type='en'):
-        url = self._make_url(word, dictionary_type)
+        if self.resolver is None:
+            self.fetch_url(self._make_url(word, dictionary_type))
+        else:
+            resolve_and_fetch(self, f'oxford-{dictionary_type}', word, dictionary_type)
+
+    def fetch_url(self, url):
+        """
+        Make cards from the page of the url.
+        :return: the canonical url of the page or None if there are no new cards
+        """
+        number_of_cards = len(self.cards)
         self.get_soup(url)
+        canonical_url = self.response.url
         self.make_cards()
+        return canonical_url if len(self.cards) > number_of_cards else None
 
     def get_soup(self, url):
         self.response = fetch_with_redirects(session=self.session, url=url)
         self.soup = BeautifulSoup(self.response.text, "html.parser")
 
+    def release(self):
+        """
+        Free the parsed page and the response, the cards are kept.
+
+        """
+        if self.soup is not None:
+            self.soup.decompose()
+            self.soup = None
+        if self.response is not None:
+            self.response.close()
+            self.response = None
+
     def _make_url(self, word, key):
         url_with_path = urljoin(self.__class__.base_url, self.__class__.path_dictionary[key])
         query = f"?q={word.replace(' ', '+')}"
@@ -275,8 +338,11 @@ class CambridgeDict:
                   'en-ru': '/dictionary/english-russian/',}
     url_parse = urlparse('https://dictionary.cambridge.org/')
 
-    def __init__(self, word, dictionary_type='en-ru', definition_limit=1):
+    def __init__(self, word, dictionary_type='en-ru', definition_limit=1, resolver=None):
         self.def_limit = definition_limit
+        self.resolver = resolver
+        self.soup = None
+        self.response = None
         self.cards = []
         self.session = requests.Session()
         self.session.headers.update({
@@ -290,11 +356,32 @@ class CambridgeDict:
         self.fetch_cards(word, dictionary_type)
 
     def fetch_cards(self, word, dictionary_type='en'):
-        self.response = fetch_with_redirects(session=self.session,
-                                             url=self._make_url(word, dictionary_type)
-                                             )
+        if self.resolver is None:
+            self.fetch_url(self._make_url(word, dictionary_type))
+        else:
+            resolve_and_fetch(self, f'cambridge-{dictionary_type}', word, dictionary_type)
+
+    def fetch_url(self, url):
+        """
+        Make cards from the page of the url.
+        :return: the canonical url of the page or None if there are no cards
+        """
+        self.response = fetch_with_redirects(session=self.session, url=url)
         self.soup = BeautifulSoup(self.response.text, "html.parser")
         self.make_cards()
+        return self.response.url if self.cards else None
+
+    def release(self):
+        """
+        Free the parsed page and the response, the cards are kept.
+
+        """
+        if self.soup is not None:
+            self.soup.decompose()
+            self.soup = None
+        if self.response is not None:
+            self.response.close()
+            self.response = None
 
     def _make_url(self, word, dictionary_type):
 
@@ -394,6 +481,30 @@ class CambridgeDict:
         self.cards.append(card)
 
 
+def resolve_and_fetch(parser, dictionary: str, word: str, dictionary_type: str):
+    """
+    Fetch cards of the word or of its lemma with the resolver of the parser.
+    Known misses cost no requests, known hits are fetched by their canonical url.
+
+    """
+    fetched_urls = []
+
+    def fetch(candidate):
+        try:
+            url = parser.fetch_url(parser._make_url(candidate, dictionary_type))
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            url = None
+        fetched_urls.append(url)
+        return url
+
+    url = parser.resolver.resolve(dictionary, word, fetch)
+    if url and url not in fetched_urls:
+        # it is known from the cache
+        parser.fetch_url(url)
+
+
 def fetch_with_redirects(session: Session, url: str, max_redirects: int = 10) -> requests.Response:
     """
     Fetch URL with manual redirect handling.
@@ -403,6 +514,7 @@ def fetch_with_redirects(session: Session, url: str, max_redirects: int = 10) ->
 
     for _ in range(max_redirects):
         response = session.get(current_url, allow_redirects=False)
+        count_traffic(requests=1, received=len(response.content))
 
         if response.status_code == 200:
             return response
@@ -427,19 +539,31 @@ class LanGeekDict:
     api_url = "https://api.langeek.co/v1/cs/en/word/"
     base_url = "https://dictionary.langeek.co/en/word/"
 
-    def __init__(self, word: str):
+    def __init__(self, word: str, cache=None):
 
         self.cards = []
+        if cache is not None:
+            found, cards = cache.get(word)
+            if found:
+                self.cards = cards
+                return
+
         self.response_json = self.fetch_point(word)
         self.make_cards()
 
+        if cache is not None:
+            cache.set(word, self.cards, self.photos)
+
     def make_cards(self):
         """
         Create cards only with pictures
         :return: list of cards
         """
+        # (entry, pos) -> whether there are photos
+        self.photos = {}
         for item in self.response_json:
             for pos in item["translations"].keys():
+                self.photos.setdefault((item["entry"], pos), False)
                 for meaning in item["translations"][pos]:
                     try:
                         url = urljoin(self.__class__.base_url,
@@ -451,6 +575,7 @@ class LanGeekDict:
                                                src_images=[meaning["wordPhoto"]["photo"]]
                                                )
                                           )
+                        self.photos[(item["entry"], pos)] = True
                     except KeyError:
                         pass
                     except TypeError:
@@ -464,7 +589,63 @@ class LanGeekDict:
                                 timeout=5,
                                 allow_redirects=False,
                                 )
+        count_traffic(requests=1, received=len(response.content))
         if response.status_code == 200:
             return response.json()
         else:
             response.raise_for_status()
+
+
+class LanGeekCache:
+    """
+    Persistent cache of LanGeek lookups.
+    Empty results are cached too, they expire sooner.
+    The index of (entry, pos) pairs tells whether LanGeek has photos for them.
+
+    """
+
+    def __init__(self, dirpath: str, ttl_days: float = 30, negative_ttl_days: float = 7):
+        self.terms = SqliteCache(os.path.join(dirpath, 'langeek_terms.sqlite'),
+                                 ttl=ttl_days * DAY, negative_ttl=negative_ttl_days * DAY)
+        # 'no photos' is a negative entry, it expires as soon as empty results of terms
+        self.photos = SqliteCache(os.path.join(dirpath, 'langeek_photos.sqlite'),
+                                  ttl=ttl_days * DAY, negative_ttl=negative_ttl_days * DAY)
+
+    @staticmethod
+    def _photo_key(entry: str, pos: str) -> str:
+        return f'{entry.lower()}|{pos}'
+
+    def get(self, term: str):
+        """
+        Return a pair (found, cards).
+
+        """
+        found, cards = self.terms.get(term.lower())
+        if not found:
+            return False, []
+        return True, [Card(**card) for card in cards or []]
+
+    def set(self, term: str, cards: list, photos: dict):
+        if cards:
+            self.terms.set(term.lower(), [asdict(card) for card in cards])
+        else:
+            self.terms.set_negative(term.lower())
+        for (entry, pos), has_photos in photos.items():
+            if has_photos:
+                self.photos.set(self._photo_key(entry, pos), True)
+            else:
+                self.photos.set_negative(self._photo_key(entry, pos))
+
+    def has_photos(self, entry: str, pos: str):
+        """
+        True or False if it is known whether there are photos for the entry and part of speech, otherwise None.
+
+        """
+        found, has_photos = self.photos.get(self._photo_key(entry, pos))
+        if not found:
+            return None
+        return has_photos is not None
+
+    def save(self):
+        self.terms.save()
+        self.photos.save()
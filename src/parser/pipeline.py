@@ -0,0 +1,248 @@
+import gc
+import os
+import sys
+import time
+import queue
+import ctypes
+import threading
+
+
+_END = object()
+
+POLL_INTERVAL = 0.1
+
+
+def _linux_rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    _fields_ = [('cb', ctypes.c_uint32),
+                ('PageFaultCount', ctypes.c_uint32),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t)]
+
+
+def _windows_rss():
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+    get_memory_info = kernel32.K32GetProcessMemoryInfo
+    get_memory_info.argtypes = [ctypes.c_void_p, ctypes.POINTER(_ProcessMemoryCounters), ctypes.c_uint32]
+    if not get_memory_info(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        raise OSError("GetProcessMemoryInfo failed")
+    return counters.WorkingSetSize
+
+
+class _MachTaskBasicInfo(ctypes.Structure):
+    _fields_ = [('virtual_size', ctypes.c_uint64),
+                ('resident_size', ctypes.c_uint64),
+                ('resident_size_max', ctypes.c_uint64),
+                ('user_time', ctypes.c_int32 * 2),
+                ('system_time', ctypes.c_int32 * 2),
+                ('policy', ctypes.c_int32),
+                ('suspend_count', ctypes.c_int32)]
+
+
+MACH_TASK_BASIC_INFO = 20
+
+
+def _macos_rss():
+    libc = ctypes.CDLL('/usr/lib/libSystem.B.dylib')
+    info = _MachTaskBasicInfo()
+    count = ctypes.c_uint32(ctypes.sizeof(info) // ctypes.sizeof(ctypes.c_uint32))
+    # mach_task_self() is a macro of this variable
+    task = ctypes.c_uint32.in_dll(libc, 'mach_task_self_')
+    libc.task_info.argtypes = [ctypes.c_uint32, ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint32)]
+    if libc.task_info(task, MACH_TASK_BASIC_INFO, ctypes.byref(info), ctypes.byref(count)) != 0:
+        raise OSError("task_info failed")
+    return info.resident_size
+
+
+def current_rss():
+    """
+    Resident memory of the process in bytes or None if it is unknown.
+    Anki has no psutil, so the memory is read from the OS directly.
+
+    """
+    if sys.platform.startswith('win'):
+        probe = _windows_rss
+    elif sys.platform == 'darwin':
+        probe = _macos_rss
+    else:
+        probe = _linux_rss
+    try:
+        return probe()
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class Stage:
+    """
+    Step of the pipeline, function(item) returns the item for the next stage or None to drop it.
+
+    """
+
+    def __init__(self, name: str, function, workers: int = 1):
+        self.name = name
+        self.function = function
+        self.workers = max(workers, 1)
+
+
+class Pipeline:
+    """
+    Streaming pipeline of stages connected with bounded queues.
+    A stage waits while the queue of the next one is full, so the whole pipeline
+    runs at the speed of its slowest stage and only a few items are in memory at once.
+    New items are not taken while resident memory is over memory_limit.
+
+    """
+
+    def __init__(self, stages: list, queue_size: int = 4, memory_limit: int = None, on_error=None,
+                 stop_event: threading.Event = None):
+        """
+        :param on_error: function(stage_name, item, exception), the item is dropped after it
+        :param stop_event: the pipeline stops when it is set, items in progress finish their current stage
+        """
+        self.stages = stages
+        self.queue_size = max(queue_size, 1)
+        self.memory_limit = memory_limit
+        self.on_error = on_error
+        self._stopped = stop_event if stop_event is not None else threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._error = None
+
+    def _put(self, q, item):
+        while not self._stopped.is_set():
+            try:
+                q.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stopped.is_set():
+            try:
+                return q.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _END
+
+    def stop(self):
+        self._stopped.set()
+
+    def _item_done(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _wait_for_memory(self):
+        """
+        Wait while memory is over the limit and there are items in the pipeline to finish.
+
+        """
+        if self.memory_limit is None:
+            return
+        collected = False
+        while not self._stopped.is_set():
+            rss = current_rss()
+            if rss is None or rss < self.memory_limit:
+                return
+            if not collected:
+                gc.collect()
+                collected = True
+                continue
+            with self._lock:
+                if self._in_flight == 0:
+                    # nothing to wait for, items go one by one
+                    return
+            time.sleep(POLL_INTERVAL)
+
+    def _feed(self, items, output):
+        try:
+            for item in items:
+                self._wait_for_memory()
+                with self._lock:
+                    self._in_flight += 1
+                if not self._put(output, item):
+                    return
+        except Exception as e:
+            # it is raised by run() when the items already taken are done
+            self._error = e
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._put(output, _END)
+
+    def _work(self, stage, input_queue, output, finished, next_workers):
+        while True:
+            item = self._get(input_queue)
+            if item is _END:
+                break
+            try:
+                result = stage.function(item)
+            except Exception as e:
+                result = None
+                if self.on_error:
+                    self.on_error(stage.name, item, e)
+            # the item is released before waiting for the next one
+            del item
+            if result is None:
+                self._item_done()
+            elif not self._put(output, result):
+                break
+            del result
+
+        with self._lock:
+            finished[0] += 1
+            is_last = finished[0] == stage.workers
+        if is_last:
+            for _ in range(next_workers):
+                self._put(output, _END)
+
+    def run(self, items):
+        """
+        Pass the items through the stages.
+        :param items: iterable, it is consumed lazily
+        :return: generator of results of the last stage,
+                 an exception of the items iterable is raised after the last result
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            next_workers = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            finished = [0]
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(target=self._work,
+                                                args=(stage, queues[i], queues[i + 1], finished, next_workers),
+                                                daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                result = self._get(queues[-1])
+                if result is _END:
+                    break
+                self._item_done()
+                yield result
+                del result
+        finally:
+            self._stopped.set()
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+
+MAX_ATTEMPTS = 3
+
+
+class PrefetchQueue:
+    """
+    Persistent queue of words to fetch before they are added.
+    Items are [dictionary_name, word, attempts].
+
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._items = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return [item for item in items if isinstance(item, list) and len(item) == 3]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def add(self, dictionary_name: str, words):
+        """
+        Queue the words, words already in the queue are skipped.
+
+        """
+        with self._lock:
+            queued = {(item[0], item[1]) for item in self._items}
+            for word in words:
+                word = word.strip()
+                if word and (dictionary_name, word) not in queued:
+                    self._items.append([dictionary_name, word, 0])
+                    queued.add((dictionary_name, word))
+        self.save()
+
+    def peek(self):
+        """
+        Return the next pair (dictionary_name, word) or None if the queue is empty.
+
+        """
+        with self._lock:
+            if not self._items:
+                return None
+            return self._items[0][0], self._items[0][1]
+
+    def done(self, dictionary_name: str, word: str):
+        with self._lock:
+            self._items = [item for item in self._items if (item[0], item[1]) != (dictionary_name, word)]
+        self.save()
+
+    def failed(self, dictionary_name: str, word: str):
+        """
+        Move the word to the end of the queue, it is dropped after MAX_ATTEMPTS.
+
+        """
+        with self._lock:
+            for item in self._items:
+                if (item[0], item[1]) == (dictionary_name, word):
+                    self._items.remove(item)
+                    item[2] += 1
+                    if item[2] < MAX_ATTEMPTS:
+                        self._items.append(item)
+                    break
+        self.save()
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._items, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+class Budget:
+    """
+    Limits of requests and downloaded bytes in a sliding window of time.
+
+    """
+
+    def __init__(self, max_requests: int, max_bytes: int, window: float = 60.0):
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.window = window
+        self._lock = threading.Lock()
+        self._records = deque()  # (time, requests, bytes)
+
+    def _expire(self, now):
+        while self._records and now - self._records[0][0] > self.window:
+            self._records.popleft()
+
+    def allows(self) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            requests = sum(record[1] for record in self._records)
+            downloaded = sum(record[2] for record in self._records)
+        return requests < self.max_requests and downloaded < self.max_bytes
+
+    def record(self, requests: int = 0, downloaded: int = 0):
+        with self._lock:
+            self._records.append((time.monotonic(), requests, downloaded))
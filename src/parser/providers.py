@@ -0,0 +1,282 @@
+import time
+import threading
+
+from .parser import CambridgeDict, LanGeekCache, LanGeekDict, OxfordDict
+
+
+DEFINITIONS = 'definitions'
+TRANSLATIONS = 'translations'
+AUDIO = 'audio'
+IMAGES = 'images'
+
+# capabilities needed to fill the fields of a note
+NOTE_CAPABILITIES = (DEFINITIONS, TRANSLATIONS, AUDIO, IMAGES)
+
+
+def has_capability(card, capability: str) -> bool:
+    """
+    Check whether the card already has the data of the capability.
+
+    """
+    if capability == DEFINITIONS:
+        return any(block.get('definition') for block in card.data)
+    if capability == TRANSLATIONS:
+        return any(block.get('translate') for block in card.data)
+    if capability == AUDIO:
+        return bool(card.src_uk_mp3 or card.src_us_mp3)
+    if capability == IMAGES:
+        return bool(card.src_images)
+    return False
+
+
+def merge_capability(card, donor, capability: str):
+    """
+    Copy the data of the capability from the donor card with the same word and part of speech.
+    Translations are not merged, senses of different dictionaries can not be matched.
+
+    """
+    if card.word != donor.word or card.pos != donor.pos:
+        return
+    if capability == IMAGES:
+        card.add_images_equal_pos(donor)
+    elif capability == AUDIO:
+        if not card.src_uk_mp3:
+            card.src_uk_mp3, card.pron_uk = donor.src_uk_mp3, card.pron_uk or donor.pron_uk
+        if not card.src_us_mp3:
+            card.src_us_mp3, card.pron_us = donor.src_us_mp3, card.pron_us or donor.pron_us
+    elif capability == DEFINITIONS:
+        if not has_capability(card, DEFINITIONS):
+            card.data = [dict(block) for block in donor.data]
+
+
+class Provider:
+    """
+    Dictionary backend.
+    A primary provider makes cards for a query (it is shown in the menu),
+    an enricher adds the data of its capabilities to cards made by other providers.
+
+    """
+    name = ''
+    capabilities = frozenset()
+    cost = 1             # relative cost of one lookup, cheaper enrichers are asked first
+    min_interval = 0.0   # rate limit, seconds between two lookups
+    primary = False
+    enriches = None      # names of primary providers it can enrich, None for any
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_lookup = 0.0
+
+    def configure(self, config: dict, user_files_dir: str):
+        """
+        Set up the provider from the add-on config, it is called before every lookup.
+
+        """
+
+    def save(self):
+        """
+        Save persistent state of the provider.
+
+        """
+
+    def _throttle(self):
+        with self._lock:
+            delay = self._last_lookup + self.min_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._last_lookup = time.monotonic()
+
+    def lookup(self, query: str, definition_limit: int, resolver=None) -> list:
+        self._throttle()
+        return self.fetch(query, definition_limit, resolver)
+
+    def fetch(self, query: str, definition_limit: int, resolver=None) -> list:
+        raise NotImplementedError
+
+    def can_enrich(self, primary_name: str, cards: list) -> bool:
+        return self.enriches is None or primary_name in self.enriches
+
+    def enrich(self, query: str, cards: list, capabilities, definition_limit: int = 1, resolver=None):
+        """
+        Add the data of the capabilities from donor cards with the same word and part of speech.
+        The donor cards are looked up once for all capabilities.
+
+        """
+        donor_cards = self.lookup(query, definition_limit, resolver)
+        for card in cards:
+            for capability in capabilities:
+                if has_capability(card, capability):
+                    continue
+                for donor_card in donor_cards:
+                    merge_capability(card, donor_card, capability)
+
+
+class OxfordProvider(Provider):
+    name = 'Oxford'
+    capabilities = frozenset({DEFINITIONS, AUDIO, IMAGES})
+    cost = 3
+    min_interval = 1.0
+    primary = True
+    enriches = ()
+
+    def fetch(self, query, definition_limit, resolver=None):
+        parser = OxfordDict(query, dictionary_type='en', definition_limit=definition_limit, resolver=resolver)
+        parser.release()
+        return parser.cards
+
+
+class CambridgeProvider(Provider):
+    name = 'Cambridge'
+    capabilities = frozenset({DEFINITIONS, TRANSLATIONS, AUDIO, IMAGES})
+    cost = 2
+    min_interval = 1.0
+    primary = True
+    enriches = ()
+
+    def fetch(self, query, definition_limit, resolver=None):
+        # get main meaning from English-Russian Cambridge Dictionary
+        parser = CambridgeDict(query, dictionary_type='en-ru', definition_limit=definition_limit,
+                               resolver=resolver)
+        parser.release()
+        if not parser.cards:
+            # get main meaning from English Cambridge Dictionary
+            parser = CambridgeDict(query, dictionary_type='en', definition_limit=definition_limit,
+                                   resolver=resolver)
+            parser.release()
+        return parser.cards
+
+
+class CambridgeImagesProvider(Provider):
+    """
+    Pictures from English Cambridge Dictionary for cards of English-Russian one.
+
+    """
+    name = 'Cambridge images'
+    capabilities = frozenset({IMAGES})
+    cost = 2
+    min_interval = 1.0
+    enriches = ('Cambridge',)
+
+    def can_enrich(self, primary_name, cards):
+        # cards from English Cambridge Dictionary have already got its pictures
+        return (super().can_enrich(primary_name, cards)
+                and any(CambridgeDict.dictionary['en'] not in card.source for card in cards))
+
+    def fetch(self, query, definition_limit, resolver=None):
+        parser = CambridgeDict(query, dictionary_type='en', definition_limit=definition_limit,
+                               resolver=resolver)
+        parser.release()
+        return parser.cards
+
+
+class LanGeekProvider(Provider):
+    name = 'LanGeek'
+    capabilities = frozenset({IMAGES})
+    cost = 1
+    min_interval = 0.5
+
+    def __init__(self):
+        super().__init__()
+        self.cache = None
+
+    def configure(self, config, user_files_dir):
+        if self.cache is None:
+            settings = config.get('langeek_cache') or {}
+            self.cache = LanGeekCache(user_files_dir,
+                                      ttl_days=settings.get('ttl_days', 30),
+                                      negative_ttl_days=settings.get('negative_ttl_days', 7))
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.save()
+
+    def lookup(self, query, definition_limit, resolver=None):
+        if self.cache is not None and self.cache.get(query)[0]:
+            # cached results are not rate limited
+            return self.fetch(query, definition_limit, resolver)
+        return super().lookup(query, definition_limit, resolver)
+
+    def can_enrich(self, primary_name, cards):
+        if self.cache is None:
+            return super().can_enrich(primary_name, cards)
+        # skip the lookup if it is known that there are no photos for any card
+        return super().can_enrich(primary_name, cards) and any(
+            self.cache.has_photos(card.word, card.pos) is not False for card in cards)
+
+    def fetch(self, query, definition_limit, resolver=None):
+        return LanGeekDict(query, cache=self.cache).cards
+
+
+_providers = {}
+_configure_lock = threading.Lock()
+
+
+def register_provider(provider: Provider):
+    """
+    Add the provider to the registry, a provider with the same name is replaced.
+
+    """
+    _providers[provider.name] = provider
+
+
+def get_provider(name: str) -> Provider:
+    return _providers[name]
+
+
+def primary_providers() -> list:
+    return [provider for provider in _providers.values() if provider.primary]
+
+
+def configure_providers(config: dict, user_files_dir: str):
+    # lookups run in background threads too, providers must not be set up twice
+    with _configure_lock:
+        for provider in _providers.values():
+            provider.configure(config, user_files_dir)
+
+
+def save_providers():
+    for provider in _providers.values():
+        provider.save()
+
+
+def plan_enrichers(primary: Provider, capabilities) -> list:
+    """
+    Providers which can add any of the capabilities to cards of the primary provider, the cheapest first.
+
+    """
+    enrichers = [provider for provider in _providers.values()
+                 if provider is not primary and provider.capabilities & set(capabilities)]
+    return sorted(enrichers, key=lambda provider: provider.cost)
+
+
+def fetch_cards(primary_name: str, query: str, definition_limit: int, resolver=None,
+                capabilities=NOTE_CAPABILITIES) -> list:
+    """
+    Make cards with the primary provider and fill out the missing capabilities with enrichers.
+    Every enricher is asked at most once, for all the missing capabilities it covers,
+    and only while some cards still lack them.
+
+    """
+    primary = get_provider(primary_name)
+    cards = primary.lookup(query, definition_limit, resolver)
+    if not cards:
+        return cards
+
+    for enricher in plan_enrichers(primary, capabilities):
+        missing = [capability for capability in capabilities
+                   if capability in enricher.capabilities
+                   and any(not has_capability(card, capability) for card in cards)]
+        if not missing:
+            continue
+        lacking = [card for card in cards
+                   if any(not has_capability(card, capability) for capability in missing)]
+        if enricher.can_enrich(primary.name, lacking):
+            enricher.enrich(query, lacking, missing, definition_limit, resolver)
+
+    return cards
+
+
+register_provider(CambridgeProvider())
+register_provider(OxfordProvider())
+register_provider(CambridgeImagesProvider())
+register_provider(LanGeekProvider())
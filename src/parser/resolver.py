@@ -0,0 +1,211 @@
+import re
+
+from .cache import SqliteCache, DAY
+
+
+IRREGULAR_FORMS = {
+    'geese': 'goose', 'mice': 'mouse', 'lice': 'louse', 'feet': 'foot', 'teeth': 'tooth',
+    'men': 'man', 'women': 'woman', 'children': 'child', 'people': 'person', 'oxen': 'ox',
+    'was': 'be', 'were': 'be', 'been': 'be', 'is': 'be', 'are': 'be', 'am': 'be',
+    'had': 'have', 'has': 'have', 'did': 'do', 'done': 'do', 'does': 'do',
+    'went': 'go', 'gone': 'go', 'goes': 'go', 'got': 'get', 'gotten': 'get',
+    'made': 'make', 'said': 'say', 'saw': 'see', 'seen': 'see', 'took': 'take', 'taken': 'take',
+    'came': 'come', 'gave': 'give', 'given': 'give', 'knew': 'know', 'known': 'know',
+    'thought': 'think', 'bought': 'buy', 'brought': 'bring', 'caught': 'catch', 'taught': 'teach',
+    'fought': 'fight', 'sought': 'seek', 'told': 'tell', 'sold': 'sell', 'found': 'find',
+    'left': 'leave', 'felt': 'feel', 'kept': 'keep', 'slept': 'sleep', 'meant': 'mean',
+    'met': 'meet', 'ran': 'run', 'ate': 'eat', 'eaten': 'eat', 'wrote': 'write', 'written': 'write',
+    'spoke': 'speak', 'spoken': 'speak', 'broke': 'break', 'broken': 'break', 'chose': 'choose',
+    'chosen': 'choose', 'began': 'begin', 'begun': 'begin', 'drank': 'drink', 'drunk': 'drink',
+    'drove': 'drive', 'driven': 'drive', 'rode': 'ride', 'ridden': 'ride', 'rose': 'rise',
+    'risen': 'rise', 'fell': 'fall', 'fallen': 'fall', 'flew': 'fly', 'flown': 'fly',
+    'grew': 'grow', 'grown': 'grow', 'threw': 'throw', 'thrown': 'throw', 'wore': 'wear',
+    'worn': 'wear', 'stole': 'steal', 'stolen': 'steal', 'forgot': 'forget', 'forgotten': 'forget',
+    'held': 'hold', 'stood': 'stand', 'understood': 'understand', 'sat': 'sit', 'lay': 'lie',
+    'lain': 'lie', 'led': 'lead', 'paid': 'pay', 'built': 'build', 'sent': 'send', 'spent': 'spend',
+    'lost': 'lose', 'won': 'win', 'hung': 'hang', 'sang': 'sing', 'sung': 'sing',
+    'swam': 'swim', 'swum': 'swim', 'better': 'good', 'best': 'good', 'worse': 'bad', 'worst': 'bad',
+}
+
+VOWELS = 'aeiou'
+CONSONANTS = 'bcdfghjklmnpqrstvwxz'
+
+# every candidate may cost a request, so only the most likely lemmas are tried
+MAX_CANDIDATES = 3
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize the query: lower case, straight apostrophes and single spaces.
+
+    """
+    query = query.replace('’', "'").replace('‘', "'")
+    query = re.sub(r'\s+', ' ', query).strip(' .,;:!?"').lower()
+    return query
+
+
+def _needs_e(stem: str) -> bool:
+    """
+    Whether a stem of -ed/-ing form most likely lost its final 'e':
+    mak(ing), hop(ed), handl(ed), danc(ing), solv(ed), argu(ed).
+
+    """
+    if stem.endswith('e'):
+        return False
+    if stem[-1] in 'cvu':
+        return True
+    # consonant + l: handl, settl, troubl
+    if len(stem) > 1 and stem[-1] == 'l' and stem[-2] in CONSONANTS and stem[-2] not in 'lrw':
+        return True
+    # consonant + vowel + consonant: mak, hop, us
+    return (len(stem) > 1 and stem[-1] in CONSONANTS and stem[-1] not in 'wxy'
+            and stem[-2] in VOWELS and (len(stem) == 2 or stem[-3] not in VOWELS))
+
+
+def _is_plausible(lemma: str) -> bool:
+    """
+    Drop candidates which cannot be English headwords, they would only cost a request.
+
+    """
+    if len(lemma) < 2 or not any(char in VOWELS + 'y' for char in lemma):
+        return False
+    if lemma[-1] in 'jqv':
+        return False
+    # handl, troubl
+    if lemma[-1] == 'l' and lemma[-2] in CONSONANTS and lemma[-2] not in 'lrw':
+        return False
+    return True
+
+
+def word_lemmas(word: str) -> list:
+    """
+    Candidate lemmas of an inflected word, the most likely first.
+    For example: 'handled' -> ['handle'], 'walked' -> ['walk', 'walke'], 'ties' -> ['tie', 'ty']
+
+    """
+    if word in IRREGULAR_FORMS:
+        return [IRREGULAR_FORMS[word]]
+
+    lemmas = []
+
+    def add(lemma):
+        if lemma != word and lemma not in lemmas and _is_plausible(lemma):
+            lemmas.append(lemma)
+
+    if word.endswith('ies'):
+        # ties -> tie, studies -> study
+        if len(word) <= 4:
+            add(word[:-1])
+        add(word[:-3] + 'y')
+        add(word[:-1])
+    elif word.endswith('ied'):
+        # tied -> tie, studied -> study
+        if len(word) <= 4:
+            add(word[:-1])
+        add(word[:-3] + 'y')
+    elif word.endswith('ves'):
+        # knives -> knife, lives -> life, live, wolves -> wolf, leaves -> leaf, leave
+        if len(word) > 3 and word[-4] == 'i':
+            add(word[:-3] + 'fe')
+            add(word[:-1])
+        add(word[:-3] + 'f')
+        add(word[:-1])
+    elif word.endswith('es'):
+        # boxes -> box, watches -> watch, makes -> make
+        stem = word[:-2]
+        if stem.endswith(('s', 'x', 'z', 'ch', 'sh')):
+            add(stem)
+            add(word[:-1])
+        else:
+            add(word[:-1])
+            add(stem)
+    elif word.endswith('s') and not word.endswith('ss'):
+        add(word[:-1])
+
+    for ending in ('ed', 'ing'):
+        if word.endswith(ending) and not word.endswith('ied'):
+            stem = word[:-len(ending)]
+            if not stem:
+                continue
+            if ending == 'ed' and stem.endswith('e'):
+                # agreed -> agree
+                add(word[:-1])
+            # stopped -> stop, but kissed -> kiss
+            if len(stem) > 2 and stem[-1] == stem[-2] and stem[-1] not in VOWELS + 'lsz':
+                add(stem[:-1])
+                add(stem)
+            elif _needs_e(stem):
+                add(stem + 'e')
+                add(stem)
+            else:
+                add(stem)
+                if not stem.endswith('e'):
+                    add(stem + 'e')
+
+    return lemmas
+
+
+class HeadwordResolver:
+    """
+    Resolves queries to canonical urls of dictionary pages.
+    Both hits and misses are memoized persistently, misses expire sooner.
+
+    """
+
+    def __init__(self, path: str, ttl_days: float = 90, negative_ttl_days: float = 7):
+        self.cache = SqliteCache(path, ttl=ttl_days * DAY, negative_ttl=negative_ttl_days * DAY)
+
+    @staticmethod
+    def _key(dictionary: str, query: str) -> str:
+        return f'{dictionary}:{query}'
+
+    def candidates(self, query: str) -> list:
+        """
+        The normalized query followed by its lemmas.
+        Only the first word of a phrase is inflected: 'gave up' -> 'give up'.
+
+        """
+        query = normalize_query(query)
+        if not query:
+            return []
+        first, _, rest = query.partition(' ')
+        candidates = [query]
+        for lemma in word_lemmas(first):
+            candidates.append(f'{lemma} {rest}' if rest else lemma)
+        return candidates[:MAX_CANDIDATES]
+
+    def lookup(self, dictionary: str, query: str):
+        """
+        Return a pair (found, url), the url is None if the query is known to be missing.
+
+        """
+        return self.cache.get(self._key(dictionary, normalize_query(query)))
+
+    def remember(self, dictionary: str, query: str, url):
+        self.cache.set(self._key(dictionary, normalize_query(query)), url)
+
+    def resolve(self, dictionary: str, query: str, fetch):
+        """
+        Try the candidates of the query until fetch(candidate) returns a url, memoize the result.
+        fetch(candidate) returns the canonical url or None if there is no such word.
+
+        :return: canonical url or None
+        """
+        found, url = self.lookup(dictionary, query)
+        if found:
+            return url
+
+        url = None
+        for candidate in self.candidates(query):
+            found, url = self.lookup(dictionary, candidate)
+            if not found:
+                url = fetch(candidate)
+                self.remember(dictionary, candidate, url)
+            if url:
+                break
+
+        self.remember(dictionary, query, url)
+        return url
+
+    def save(self):
+        self.cache.save()
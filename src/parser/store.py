@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from dataclasses import asdict
+
+from .parser import Card
+from .resolver import normalize_query
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lookups (
+    source TEXT NOT NULL,
+    query TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    definition_limit INTEGER NOT NULL,
+    PRIMARY KEY (source, query)
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    query TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    headword TEXT NOT NULL,
+    pos TEXT NOT NULL,
+    card TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_by_lookup ON cards (source, query);
+CREATE INDEX IF NOT EXISTS cards_by_headword ON cards (headword);
+CREATE INDEX IF NOT EXISTS cards_by_source_headword ON cards (source, headword COLLATE NOCASE);
+CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5 (
+    headword, definitions, examples, translations
+);
+"""
+
+
+def _fts_columns(card: Card) -> tuple:
+    return (card.word,
+            '\n'.join(block.get('definition', '') for block in card.data),
+            '\n'.join('\n'.join(block.get('examples', [])) for block in card.data),
+            '\n'.join(block.get('translate', '') for block in card.data))
+
+
+class DictionaryStore:
+    """
+    Local dictionary in SQLite.
+    It keeps parsed cards per source and query, so they are served without scraping,
+    and indexes their headwords, definitions, examples and translations for full-text search.
+
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def get_cards(self, source: str, query: str, definition_limit: int = 1):
+        """
+        Return stored cards of the query or None if they were not stored.
+        If the query itself was not stored, stored cards with the query as their headword are returned,
+        so 'handle' is served by the lookup of 'handled'. Lemmas of the query are never guessed,
+        'news' is not served by 'new'.
+        Lookups stored with a smaller definition limit are missing.
+
+        """
+        query = normalize_query(query)
+        with self._lock:
+            row = self._connection.execute('SELECT definition_limit FROM lookups WHERE source = ? AND query = ?',
+                                           (source, query)).fetchone()
+            if row and row[0] >= definition_limit:
+                return self._cards(source, query)
+
+            row = self._connection.execute(
+                'SELECT lookups.query FROM cards JOIN lookups '
+                'ON lookups.source = cards.source AND lookups.query = cards.query '
+                'WHERE cards.source = ? AND cards.headword = ? COLLATE NOCASE '
+                'AND lookups.definition_limit >= ? LIMIT 1',
+                (source, query, definition_limit)).fetchone()
+            if row:
+                # other headwords of that lookup are not the query, e.g. 'left' for 'leave'
+                return self._cards(source, row[0], headword=query)
+        return None
+
+    def _cards(self, source, query, headword=None):
+        sql = 'SELECT card FROM cards WHERE source = ? AND query = ?'
+        parameters = (source, query)
+        if headword is not None:
+            sql += ' AND headword = ? COLLATE NOCASE'
+            parameters += (headword,)
+        rows = self._connection.execute(sql + ' ORDER BY position', parameters).fetchall()
+        return [Card(**json.loads(row[0])) for row in rows]
+
+    def put_cards(self, source: str, query: str, cards: list, definition_limit: int = 1):
+        """
+        Store cards of the query fetched with the definition limit,
+        previously stored cards of the query are replaced.
+
+        """
+        query = normalize_query(query)
+        with self._lock, self._connection:
+            self._delete(source, query)
+            self._connection.execute('INSERT INTO lookups (source, query, fetched, definition_limit) '
+                                     'VALUES (?, ?, ?, ?)', (source, query, time.time(), definition_limit))
+            for position, card in enumerate(cards):
+                self._insert(source, query, position, card.word, card.pos,
+                             json.dumps(asdict(card), ensure_ascii=False), _fts_columns(card))
+
+    def _delete(self, source, query):
+        ids = [row[0] for row in self._connection.execute(
+            'SELECT id FROM cards WHERE source = ? AND query = ?', (source, query))]
+        self._connection.executemany('DELETE FROM cards_fts WHERE rowid = ?', [(i,) for i in ids])
+        self._connection.execute('DELETE FROM cards WHERE source = ? AND query = ?', (source, query))
+        self._connection.execute('DELETE FROM lookups WHERE source = ? AND query = ?', (source, query))
+
+    def _insert(self, source, query, position, headword, pos, card_json, fts_columns):
+        cursor = self._connection.execute(
+            'INSERT INTO cards (source, query, position, headword, pos, card) VALUES (?, ?, ?, ?, ?, ?)',
+            (source, query, position, headword, pos, card_json))
+        self._connection.execute(
+            'INSERT INTO cards_fts (rowid, headword, definitions, examples, translations) '
+            'VALUES (?, ?, ?, ?, ?)', (cursor.lastrowid, *fts_columns))
+
+    def headwords(self) -> list:
+        with self._lock:
+            rows = self._connection.execute('SELECT DISTINCT headword FROM cards').fetchall()
+        return [row[0] for row in rows]
+
+    def search(self, text: str, limit: int = 20) -> list:
+        """
+        Full-text search in headwords, definitions, examples and translations.
+        :return: list of tuples (source, headword, pos) of the best matches
+        """
+        # every word is a quoted prefix term, so the text may contain any characters
+        terms = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in text.split())
+        if not terms:
+            return []
+        with self._lock:
+            return self._connection.execute(
+                'SELECT cards.source, cards.headword, cards.pos FROM cards_fts '
+                'JOIN cards ON cards.id = cards_fts.rowid '
+                'WHERE cards_fts MATCH ? ORDER BY rank LIMIT ?', (terms, limit)).fetchall()
+
+    def export_snapshot(self, path: str):
+        """
+        Write a copy of the store to the file.
+
+        """
+        with self._lock:
+            target = sqlite3.connect(path)
+            try:
+                self._connection.backup(target)
+            finally:
+                target.close()
+
+    def import_snapshot(self, path: str) -> int:
+        """
+        Merge a snapshot into the store, its lookups replace stored ones.
+        :return: number of imported lookups
+        """
+        snapshot = sqlite3.connect(path)
+        try:
+            lookups = snapshot.execute('SELECT source, query, fetched, definition_limit FROM lookups').fetchall()
+            with self._lock, self._connection:
+                for source, query, fetched, definition_limit in lookups:
+                    self._delete(source, query)
+                    self._connection.execute('INSERT INTO lookups (source, query, fetched, definition_limit) '
+                                             'VALUES (?, ?, ?, ?)', (source, query, fetched, definition_limit))
+                    rows = snapshot.execute('SELECT position, headword, pos, card FROM cards '
+                                            'WHERE source = ? AND query = ?', (source, query))
+                    for position, headword, pos, card_json in rows:
+                        card = Card(**json.loads(card_json))
+                        self._insert(source, query, position, headword, pos, card_json, _fts_columns(card))
+        finally:
+            snapshot.close()
+        return len(lookups)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,57 @@
+import bisect
+import threading
+
+from .resolver import normalize_query
+
+
+class PrefixIndex:
+    """
+    Index of headwords for prefix completions.
+    Headwords are kept in a sorted list, so a lookup is a binary search
+    and it stays fast and compact with hundreds of thousands of entries.
+
+    """
+
+    def __init__(self, words=()):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._words = {}  # normalized key -> headword as it was added
+        self.update(words)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, word):
+        return normalize_query(word) in self._words
+
+    def update(self, words):
+        with self._lock:
+            for word in words:
+                key = normalize_query(word)
+                if key and key not in self._words:
+                    self._words[key] = word
+            self._keys = sorted(self._words)
+
+    def add(self, word: str):
+        key = normalize_query(word)
+        with self._lock:
+            if key and key not in self._words:
+                self._words[key] = word
+                bisect.insort(self._keys, key)
+
+    def complete(self, prefix: str, limit: int = 10) -> list:
+        """
+        Headwords starting with the prefix in alphabetical order.
+
+        """
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._keys, prefix)
+            keys = []
+            for key in self._keys[start:start + limit]:
+                if not key.startswith(prefix):
+                    break
+                keys.append(key)
+            return [self._words[key] for key in keys]